@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'imgview.settings')
+# Disables persistent database connections; see DB_CONN_MAX_AGE in settings
+os.environ['DJANGO_ASGI'] = '1'
 
 application = get_asgi_application()
@@ -1,3 +1,93 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils import timezone
+from django.utils.functional import cached_property
+from .models import Email, EmailTracking, EmailUsage, UserProfile
 
-# Register your models here.
+# Below this many (estimated) rows an exact COUNT(*) is cheap enough
+EXACT_COUNT_LIMIT = 10000
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Uses the planner's row estimate for unfiltered changelists on Postgres, so
+    paging through a table with millions of rows does not run COUNT(*) each time.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            # reltuples is -1 (or 0) until the table has been analyzed
+            if row and row[0] >= EXACT_COUNT_LIMIT:
+                return int(row[0])
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    # Skips the second, unfiltered COUNT(*) shown next to filtered results
+    show_full_result_count = False
+    ordering = ('-pk',)
+
+
+@admin.register(Email)
+class EmailAdmin(LargeTableAdmin):
+    # The body lives in EmailBody and is only read on the change page
+    list_display = ('id', 'subject', 'user', 'recipient', 'category', 'starred', 'sent_at')
+    list_select_related = ('user',)
+    list_filter = ('category', 'starred', 'sent_at')
+    raw_id_fields = ('user',)
+    readonly_fields = ('tracking_id', 'message')
+    actions = ('star', 'unstar', 'move_to_trash')
+
+    @admin.action(description='Star selected emails')
+    def star(self, request, queryset):
+        updated = queryset.update(starred=True)
+        self.message_user(request, f'Starred {updated} emails.')
+
+    @admin.action(description='Unstar selected emails')
+    def unstar(self, request, queryset):
+        updated = queryset.update(starred=False)
+        self.message_user(request, f'Unstarred {updated} emails.')
+
+    @admin.action(description='Move selected emails to trash')
+    def move_to_trash(self, request, queryset):
+        updated = queryset.exclude(category='trash').update(category='trash', trashed_at=timezone.now())
+        self.message_user(request, f'Moved {updated} emails to trash.')
+
+
+@admin.register(EmailTracking)
+class EmailTrackingAdmin(LargeTableAdmin):
+    list_display = ('email', 'opened', 'opened_at', 'clicked', 'clicked_at')
+    list_select_related = ('email',)
+    list_filter = ('opened', 'clicked')
+    raw_id_fields = ('email',)
+
+
+@admin.register(EmailUsage)
+class EmailUsageAdmin(LargeTableAdmin):
+    list_display = ('user', 'emails_sent_today', 'last_reset_date')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    actions = ('reset_daily_limit',)
+
+    @admin.action(description='Reset daily email limit')
+    def reset_daily_limit(self, request, queryset):
+        updated = queryset.update(emails_sent_today=0, last_reset_date=timezone.now().date())
+        self.message_user(request, f'Reset {updated} usage records.')
+
+
+@admin.register(UserProfile)
+class UserProfileAdmin(LargeTableAdmin):
+    list_display = ('user', 'bio')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class MailerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'mailer'
+
+    def ready(self):
+        from .routers import note_saved
+        post_save.connect(note_saved, dispatch_uid='mailer_note_saved')
+        post_delete.connect(note_saved, dispatch_uid='mailer_note_deleted')
@@ -0,0 +1,43 @@
+import zlib
+from django.conf import settings
+
+
+def compress_text(text):
+    return zlib.compress(text.encode('utf-8'), 6)
+
+
+def decompress_text(data):
+    return zlib.decompress(bytes(data)).decode('utf-8')
+
+
+def encode_body(text):
+    """
+    Return (codec, data) for storing a message body. Bodies shorter than
+    BODY_COMPRESSION_THRESHOLD bytes are stored as-is since compressing them
+    saves little and costs CPU on every read.
+    """
+    raw = text.encode('utf-8')
+    if len(raw) < settings.BODY_COMPRESSION_THRESHOLD:
+        return 'raw', raw
+    if settings.BODY_COMPRESSION == 'zstd':
+        # Optional dependency, only imported when zstd is configured
+        import zstandard
+
+        compressed = zstandard.ZstdCompressor(level=3).compress(raw)
+    else:
+        compressed = zlib.compress(raw, 6)
+    # Incompressible bodies are cheaper to keep raw
+    if len(compressed) >= len(raw):
+        return 'raw', raw
+    return settings.BODY_COMPRESSION, compressed
+
+
+def decode_body(codec, data):
+    data = bytes(data)
+    if codec == 'zlib':
+        data = zlib.decompress(data)
+    elif codec == 'zstd':
+        import zstandard
+
+        data = zstandard.ZstdDecompressor().decompress(data)
+    return data.decode('utf-8')
@@ -0,0 +1,115 @@
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from heapq import nlargest
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Contact
+
+SECONDS_PER_DAY = 86400
+
+
+def rank_contacts(candidates, limit):
+    """Top `limit` of (email, send_count, last_used timestamp) rows by frecency."""
+    # Frecency: send count, halved for every CONTACT_HALF_LIFE_DAYS since last use
+    now = time.time()
+    half_life = settings.CONTACT_HALF_LIFE_DAYS * SECONDS_PER_DAY
+    scored = ((count * 0.5 ** ((now - used_at) / half_life), email) for email, count, used_at in candidates)
+    return [email for _, email in nlargest(limit, scored)]
+
+
+class ContactIndex:
+    """One user's contacts as a sorted address list for bisect prefix lookups."""
+
+    def __init__(self, contacts):
+        self.stats = {email: (count, used_at.timestamp()) for email, count, used_at in contacts}
+        self.emails = sorted(self.stats)
+
+    def note(self, email, used_at):
+        count, _ = self.stats.get(email, (0, 0))
+        if not count:
+            insort(self.emails, email)
+        self.stats[email] = (count + 1, used_at.timestamp())
+
+    def search(self, prefix, limit):
+        start = bisect_left(self.emails, prefix)
+        matches = []
+        for email in self.emails[start:start + settings.CONTACT_SCAN_LIMIT]:
+            if not email.startswith(prefix):
+                break
+            matches.append((email, *self.stats[email]))
+        return rank_contacts(matches, limit)
+
+
+class ContactCache:
+    """
+    Per-process LRU of (loaded_at, ContactIndex) entries. Entries expire after
+    CONTACT_CACHE_TTL seconds so sends handled by other workers show up.
+    """
+
+    def __init__(self):
+        self.indexes = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, user_id):
+        """Return the user's ContactIndex, or None if they have more than CONTACT_INDEX_MAX contacts."""
+        with self.lock:
+            entry = self.indexes.get(user_id)
+            if entry is not None and time.monotonic() - entry[0] < settings.CONTACT_CACHE_TTL:
+                self.indexes.move_to_end(user_id)
+                return entry[1]
+        contacts = Contact.objects.filter(user_id=user_id)
+        # Large contact lists are never pulled into memory
+        if contacts.order_by()[settings.CONTACT_INDEX_MAX:].exists():
+            index = None
+        else:
+            index = ContactIndex(contacts.values_list('email', 'send_count', 'last_used_at'))
+        with self.lock:
+            self.indexes[user_id] = (time.monotonic(), index)
+            self.indexes.move_to_end(user_id)
+            while len(self.indexes) > settings.CONTACT_CACHE_USERS:
+                self.indexes.popitem(last=False)
+        return index
+
+    def note(self, user_id, email, used_at):
+        with self.lock:
+            entry = self.indexes.get(user_id)
+            if entry is not None and entry[1] is not None:
+                entry[1].note(email, used_at)
+
+
+contact_cache = ContactCache()
+
+
+def record_contact(user_id, address, used_at=None):
+    email = address.strip().lower()
+    used_at = used_at or timezone.now()
+    contacts = Contact.objects.filter(user_id=user_id, email=email)
+    if not contacts.update(send_count=F('send_count') + 1, last_used_at=used_at):
+        try:
+            with transaction.atomic():
+                Contact.objects.create(user_id=user_id, email=email, send_count=1, last_used_at=used_at)
+        except IntegrityError:
+            # Another request created it first
+            contacts.update(send_count=F('send_count') + 1, last_used_at=used_at)
+    contact_cache.note(user_id, email, used_at)
+
+
+def suggest_contacts(user_id, prefix, limit=10):
+    prefix = prefix.strip().lower()
+    if not prefix:
+        return []
+    index = contact_cache.get(user_id)
+    if index is not None:
+        return index.search(prefix, limit)
+    # Too many contacts to cache: rank up to CONTACT_SCAN_LIMIT candidates from a
+    # prefix range scan on mailer_contact_prefix_idx, the same bound the index uses
+    candidates = (
+        Contact.objects.filter(user_id=user_id, email__startswith=prefix)
+        .order_by()
+        .values_list('email', 'send_count', 'last_used_at')[:settings.CONTACT_SCAN_LIMIT]
+    )
+    return rank_contacts(((email, count, used_at.timestamp()) for email, count, used_at in candidates), limit)
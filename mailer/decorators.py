@@ -0,0 +1,15 @@
+from functools import wraps
+from django.contrib.auth.views import redirect_to_login
+
+
+def async_login_required(view_func):
+    """login_required for async views, which Django 5.0's decorator does not support."""
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        # Replace the lazy user so templates and forms never query from the event loop
+        request.user = user
+        return await view_func(request, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,115 @@
+import logging
+import os
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.db import router, transaction, connections
+from django.utils import timezone
+from .contacts import record_contact
+from .links import rewrite_links
+from .models import Email
+from .outbound import outbound_scheduler
+
+logger = logging.getLogger(__name__)
+
+# How long a scheduled email waits before another attempt after a failed send
+RETRY_DELAY = timedelta(minutes=5)
+# After this many failed sends an email goes back to the user's drafts
+MAX_SEND_ATTEMPTS = 5
+# A claimed email not marked sent or failed within this time (because its
+# dispatcher died) is claimed again
+CLAIM_LEASE = timedelta(minutes=15)
+
+
+def due_emails(now=None):
+    now = now or timezone.now()
+    return Email.objects.filter(category='scheduled', send_at__lte=now).order_by('send_at')
+
+
+def expired_claims(now=None):
+    now = now or timezone.now()
+    return Email.objects.filter(category='sending', claimed_at__lt=now - CLAIM_LEASE).order_by('claimed_at')
+
+
+def claim(rows, limit, now):
+    """Move up to limit rows of rows(now) to 'sending' and return their ids."""
+    if limit <= 0:
+        return []
+    if connections[router.db_for_write(Email)].features.has_select_for_update_skip_locked:
+        # Rows locked by another dispatcher are skipped instead of waited on
+        with transaction.atomic():
+            ids = list(rows(now).select_for_update(skip_locked=True).values_list('pk', flat=True)[:limit])
+            Email.objects.filter(pk__in=ids).update(category='sending', claimed_at=now)
+        return ids
+    # No row locks (SQLite): the conditional update only succeeds for one process
+    return [
+        pk for pk in rows(now).values_list('pk', flat=True)[:limit]
+        if rows(now).filter(pk=pk).update(category='sending', claimed_at=now)
+    ]
+
+
+def claim_due_emails(batch_size, now=None):
+    """
+    Move up to batch_size due scheduled emails (or ones whose claim expired)
+    to 'sending' and return them. Concurrent dispatchers never claim the same row.
+    """
+    now = now or timezone.now()
+    # Separate queries so each walks its partial index in order and stops at
+    # the limit; OR-ing them would sort the whole backlog for every batch
+    ids = claim(expired_claims, batch_size, now)
+    ids += claim(due_emails, batch_size - len(ids), now)
+    return list(Email.objects.filter(pk__in=ids).select_related('body').order_by('send_at'))
+
+
+def build_message(email, connection=None):
+    body = email.message
+    if settings.SITE_URL:
+        body = rewrite_links(email, body, settings.SITE_URL)
+    else:
+        # Never guess a base URL: recipients would get links to a host they cannot reach
+        logger.warning("SITE_URL is not set; sending scheduled email %s without link tracking", email.pk)
+    message = EmailMessage(
+        subject=email.subject,
+        body=body,
+        from_email=email.sender_email,
+        to=[email.recipient],
+        connection=connection,
+    )
+    if email.attachment:
+        with email.attachment.open('rb') as attachment:
+            message.attach(os.path.basename(email.attachment.name), attachment.read())
+    return message
+
+
+def deliver(email, connection):
+    try:
+        build_message(email, connection).send()
+    except Exception:
+        logger.exception("Failed to send scheduled email %s", email.pk)
+        record_failure(email)
+        return False
+    Email.objects.filter(pk=email.pk).update(category='sent', sent_at=timezone.now(), claimed_at=None)
+    try:
+        record_contact(email.user_id, email.recipient)
+    except Exception:
+        # The email is already sent; a missing contact only affects autocomplete
+        logger.exception("Could not record contact for email %s", email.pk)
+    return True
+
+
+def record_failure(email):
+    attempts = email.send_attempts + 1
+    if attempts >= MAX_SEND_ATTEMPTS:
+        logger.warning("Giving up on scheduled email %s after %s attempts", email.pk, attempts)
+        Email.objects.filter(pk=email.pk).update(
+            category='draft', send_at=None, claimed_at=None, send_attempts=attempts
+        )
+    else:
+        Email.objects.filter(pk=email.pk).update(
+            category='scheduled', send_at=timezone.now() + RETRY_DELAY, claimed_at=None, send_attempts=attempts
+        )
+
+
+def send_claimed(emails):
+    # Grouped by recipient domain, paced and sent over shared connections; see mailer.outbound
+    return outbound_scheduler.send(emails, deliver)
@@ -0,0 +1,108 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = 'mailer_analytics'
+
+
+class Subscriber:
+    """One open analytics stream: a bounded queue owned by the stream's event loop."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue(settings.ANALYTICS_QUEUE_SIZE)
+        # Set when events were dropped because the client is not keeping up;
+        # the stream then tells the client to reload instead of sending stale deltas
+        self.overflowed = False
+
+    def deliver(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class Broker:
+    """In-process pub/sub of per-user analytics events."""
+
+    def __init__(self):
+        self.subscribers = defaultdict(set)
+        self.lock = threading.Lock()
+        self.listener = None
+
+    def subscribe(self, user_id):
+        subscriber = Subscriber(asyncio.get_running_loop())
+        with self.lock:
+            self.subscribers[user_id].add(subscriber)
+            if settings.ANALYTICS_EVENTS_TRANSPORT == 'postgres' and self.listener is None:
+                self.listener = threading.Thread(target=listen_for_notifications, name='mailer-analytics-listener', daemon=True)
+                self.listener.start()
+        return subscriber
+
+    def unsubscribe(self, user_id, subscriber):
+        with self.lock:
+            self.subscribers[user_id].discard(subscriber)
+            if not self.subscribers[user_id]:
+                del self.subscribers[user_id]
+
+    def publish_local(self, user_id, event):
+        with self.lock:
+            subscribers = list(self.subscribers.get(user_id, ()))
+        for subscriber in subscribers:
+            try:
+                # Safe from any thread; the queue is only touched on its own loop
+                subscriber.loop.call_soon_threadsafe(subscriber.deliver, event)
+            except RuntimeError:
+                # The stream's event loop has closed
+                self.unsubscribe(user_id, subscriber)
+
+
+broker = Broker()
+
+
+def publish_event(user_id, event):
+    if settings.ANALYTICS_EVENTS_TRANSPORT == 'postgres':
+        # Delivered to every worker's listener (including this one) once the transaction commits
+        with connections['default'].cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [NOTIFY_CHANNEL, json.dumps({'user_id': user_id, 'event': event})])
+    else:
+        broker.publish_local(user_id, event)
+
+
+async def apublish_event(user_id, event):
+    if settings.ANALYTICS_EVENTS_TRANSPORT == 'postgres':
+        await sync_to_async(publish_event)(user_id, event)
+    else:
+        broker.publish_local(user_id, event)
+
+
+def listen_for_notifications():
+    # One LISTEN connection per worker process, fanning notifications out to local subscribers
+    import select
+    import psycopg2
+    from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+    while True:
+        try:
+            connection = psycopg2.connect(**connections['default'].get_connection_params())
+            connection.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+            with connection.cursor() as cursor:
+                cursor.execute(f'LISTEN {NOTIFY_CHANNEL}')
+            while True:
+                if select.select([connection], [], [], 60) == ([], [], []):
+                    continue
+                connection.poll()
+                while connection.notifies:
+                    payload = json.loads(connection.notifies.pop(0).payload)
+                    broker.publish_local(payload['user_id'], payload['event'])
+        except Exception:
+            logger.exception("Analytics listener lost its connection; reconnecting")
+            time.sleep(5)
@@ -0,0 +1,197 @@
+import base64
+import io
+import logging
+import mimetypes
+import os
+import zipfile
+from email import policy
+from email.message import Message
+from email.mime.text import MIMEText
+from email.utils import format_datetime
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.text import slugify
+from .models import Email
+
+logger = logging.getLogger(__name__)
+
+FOLDERS = ('inbox', 'sent', 'draft', 'trash', 'starred')
+FORMATS = ('mbox', 'zip')
+
+# A multiple of 57 bytes encodes to whole 76-character base64 lines
+ATTACHMENT_CHUNK_SIZE = 57 * 1024
+
+
+def mailbox_emails(user, folders):
+    queryset = Email.objects.filter(user=user).select_related('body')
+    categories = Q(category__in=[folder for folder in folders if folder != 'starred'])
+    if 'starred' in folders:
+        categories |= Q(starred=True)
+    return queryset.filter(categories)
+
+
+def iter_chunked(queryset, chunk_size):
+    # Keyset pagination on pk: each chunk is a short index range query, with no
+    # long-lived cursor (server-side cursors are disabled behind pgbouncer)
+    last_pk = 0
+    while True:
+        chunk = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:chunk_size])
+        yield from chunk
+        if len(chunk) < chunk_size:
+            return
+        last_pk = chunk[-1].pk
+
+
+def attachment_chunks(field, chunk_size=ATTACHMENT_CHUNK_SIZE):
+    storage = field.storage
+    if hasattr(storage, 'stream'):
+        yield from storage.stream(field.name, chunk_size)
+        return
+    with field.open('rb'):
+        yield from field.chunks(chunk_size)
+
+
+def base64_lines(chunks, linesep):
+    # Input chunks can be any size, so carry the remainder to keep lines aligned
+    pending = b''
+    for chunk in chunks:
+        pending += chunk
+        cut = len(pending) - len(pending) % 57
+        if cut:
+            yield base64.encodebytes(pending[:cut]).replace(b'\n', linesep)
+            pending = pending[cut:]
+    if pending:
+        yield base64.encodebytes(pending).replace(b'\n', linesep)
+
+
+def header_value(value):
+    # Stored values are not guaranteed to be single-line (autosave does not
+    # validate them), and email.policy rejects headers containing CR or LF
+    return ' '.join(value.split())
+
+
+def message_chunks(email, linesep=b'\r\n'):
+    """
+    Yield an email as RFC 5322 bytes. The body is base64-encoded, so no line
+    can start with "From " and the output is safe to append to an mbox as-is.
+    Attachments are read from storage and encoded chunk by chunk.
+    """
+    message_policy = policy.SMTP.clone(linesep=linesep.decode())
+    text = MIMEText(email.message, 'plain', 'utf-8', policy=message_policy)
+
+    headers = Message(policy=message_policy)
+    headers['From'] = header_value(email.sender_email)
+    headers['To'] = header_value(email.recipient)
+    headers['Subject'] = header_value(email.subject)
+    if email.sent_at:
+        headers['Date'] = format_datetime(email.sent_at)
+    headers['Message-ID'] = f'<{email.tracking_id}@mailer>'
+    headers['X-Mailer-Folder'] = email.category
+
+    chunks = None
+    if email.attachment:
+        chunks = attachment_chunks(email.attachment)
+        try:
+            # Fetched before anything is written so a missing file only drops the attachment
+            chunks = _prepend(next(chunks, b''), chunks)
+        except Exception:
+            logger.warning("Skipping unreadable attachment %s of email %s", email.attachment.name, email.pk, exc_info=True)
+            chunks = None
+
+    if chunks is None:
+        for name, value in headers.items():
+            text[name] = value
+        yield text.as_bytes(policy=message_policy)
+        return
+
+    boundary = f'mailer-{email.tracking_id.hex}'
+    headers['MIME-Version'] = '1.0'
+    headers['Content-Type'] = f'multipart/mixed; boundary="{boundary}"'
+    del text['MIME-Version']
+    filename = os.path.basename(email.attachment.name)
+    attachment = Message(policy=message_policy)
+    attachment['Content-Type'] = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    attachment['Content-Transfer-Encoding'] = 'base64'
+    attachment.add_header('Content-Disposition', 'attachment', filename=filename)
+
+    delimiter = f'--{boundary}'.encode()
+    yield header_bytes(headers, message_policy) + linesep
+    yield delimiter + linesep + text.as_bytes(policy=message_policy) + linesep
+    yield delimiter + linesep + header_bytes(attachment, message_policy) + linesep
+    yield from base64_lines(chunks, linesep)
+    yield delimiter + b'--' + linesep
+
+
+def header_bytes(message, message_policy):
+    # The payload is streamed separately, so only the header block is serialized
+    return b''.join(message_policy.fold_binary(name, value) for name, value in message.items())
+
+
+def _prepend(first, rest):
+    yield first
+    yield from rest
+
+
+def mbox_chunks(emails):
+    for email in emails:
+        when = email.sent_at or timezone.now()
+        # The envelope sender is a single token on the separator line
+        sender = ''.join(email.sender_email.split()) or 'MAILER-DAEMON'
+        yield f'From {sender} {when.strftime("%a %b %d %H:%M:%S %Y")}\n'.encode()
+        yield from message_chunks(email, linesep=b'\n')
+        yield b'\n'
+
+
+class _StreamBuffer(io.RawIOBase):
+    # Write-only and unseekable, so zipfile streams entries with data descriptors
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def zip_chunks(emails):
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for email in emails:
+            name = f'{email.category}/{email.pk}-{slugify(email.subject)[:50] or "message"}.eml'
+            # Sizes are unknown up front; zip64 allows attachments over 4 GB
+            with archive.open(name, 'w', force_zip64=True) as entry:
+                for chunk in message_chunks(email):
+                    entry.write(chunk)
+                    if buffer.chunks:
+                        yield buffer.drain()
+            yield buffer.drain()
+    yield buffer.drain()
+
+
+def export_mailbox(user, folders=FOLDERS, export_format='mbox'):
+    """Yield a user's mailbox as an mbox file or a ZIP of .eml files without buffering it."""
+    emails = iter_chunked(mailbox_emails(user, folders), settings.EXPORT_CHUNK_SIZE)
+    return zip_chunks(emails) if export_format == 'zip' else mbox_chunks(emails)
+
+
+async def aiter_chunks(chunks):
+    """
+    Async wrapper for a chunk generator. Under ASGI, Django buffers a sync
+    iterator into a list before sending it, so the export is pulled one chunk
+    at a time on the sync thread instead.
+    """
+    sentinel = object()
+    try:
+        while (chunk := await sync_to_async(next)(chunks, sentinel)) is not sentinel:
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close)()
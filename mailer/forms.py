@@ -6,21 +6,31 @@ from django.contrib.auth.models import User
 class EmailForm(forms.ModelForm):
     sender_email = forms.EmailField(required=True)
     recipient = forms.EmailField(required=True)
+    # Not a database column: stored in EmailBody through Email.message
+    message = forms.CharField(widget=forms.Textarea)
     attachment = forms.FileField(required=False)
+    send_at = forms.DateTimeField(
+        required=False,
+        label='Schedule send (UTC)',
+        widget=forms.DateTimeInput(attrs={'type': 'datetime-local'}),
+    )
 
     class Meta:
         model = Email
-        fields = ['recipient', 'subject', 'message', 'sender_email', 'attachment']
+        fields = ['recipient', 'subject', 'message', 'sender_email', 'attachment', 'send_at']
 
     def __init__(self, *args, **kwargs):
         user = kwargs.pop('user', None)  # Extract 'user' if provided
         super().__init__(*args, **kwargs)
         if user:
             self.fields['sender_email'].initial = user.email
+        if self.instance.pk:
+            self.initial.setdefault('message', self.instance.message)
         self.user = user
 
     def save(self, commit=True):
         email = super().save(commit=False)
+        email.message = self.cleaned_data['message']
         if self.user:
             email.user = self.user  # Associate the email with the user
         if commit:
@@ -0,0 +1,164 @@
+import atexit
+import logging
+import queue
+import re
+import secrets
+import threading
+from collections import Counter, OrderedDict
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F
+from django.urls import reverse
+from django.utils import timezone
+from .events import publish_event
+from .models import Email, EmailTracking, TrackedLink
+
+logger = logging.getLogger(__name__)
+
+URL_PATTERN = re.compile(r'https?://[^\s<>"\']+')
+# Punctuation that usually ends the sentence rather than the URL
+TRAILING_PUNCTUATION = '.,;:!?)]}'
+BRACKETS = {')': '(', ']': '[', '}': '{'}
+
+
+def trim_url(url):
+    # A closing bracket stays if it matches one opened in the URL, e.g. /wiki/Foo_(bar)
+    while url and url[-1] in TRAILING_PUNCTUATION:
+        opening = BRACKETS.get(url[-1])
+        if opening and url.count(opening) >= url.count(url[-1]):
+            break
+        url = url[:-1]
+    return url
+
+
+def rewrite_links(email, body, base_url):
+    """
+    Replace every link in body with a short redirect URL. Each distinct URL
+    gets one TrackedLink per email, reused if the email is sent again.
+    """
+    codes = dict(TrackedLink.objects.filter(email=email).values_list('url', 'code'))
+    new_links = []
+
+    def replace(match):
+        url = trim_url(match.group(0))
+        if url.startswith(base_url):
+            return match.group(0)
+        if url not in codes:
+            codes[url] = secrets.token_urlsafe(6)
+            new_links.append(TrackedLink(email=email, code=codes[url], url=url))
+        return base_url + reverse('follow_link', args=[codes[url]]) + match.group(0)[len(url):]
+
+    rewritten = URL_PATTERN.sub(replace, body)
+    TrackedLink.objects.bulk_create(new_links)
+    return rewritten
+
+
+class LinkCache:
+    """Per-process LRU of code -> (url, email_id). Codes never change once issued."""
+
+    def __init__(self, size):
+        self.size = size
+        self.links = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, code):
+        with self.lock:
+            link = self.links.get(code)
+            if link is not None:
+                self.links.move_to_end(code)
+            return link
+
+    def put(self, code, link):
+        with self.lock:
+            self.links[code] = link
+            self.links.move_to_end(code)
+            if len(self.links) > self.size:
+                self.links.popitem(last=False)
+
+
+link_cache = LinkCache(settings.LINK_CACHE_SIZE)
+
+
+def load_link(code):
+    link = TrackedLink.objects.filter(code=code).values_list('url', 'email_id').first()
+    if link is not None:
+        link_cache.put(code, link)
+    return link
+
+
+def save_clicks(clicks):
+    """Apply a batch of (code, email_id) clicks with one update per link and set-based tracking updates."""
+    now = timezone.now()
+    for code, count in Counter(code for code, _ in clicks).items():
+        TrackedLink.objects.filter(code=code).update(clicks=F('clicks') + count)
+    email_clicks = Counter(email_id for _, email_id in clicks)
+    EmailTracking.objects.bulk_create(
+        [EmailTracking(email_id=email_id, clicked=True, clicked_at=now) for email_id in email_clicks],
+        ignore_conflicts=True,
+    )
+    EmailTracking.objects.filter(email_id__in=email_clicks, clicked=False).update(clicked=True, clicked_at=now)
+
+    for email_id, user_id in Email.objects.filter(pk__in=email_clicks).values_list('pk', 'user_id'):
+        publish_event(user_id, {
+            'type': 'clicked', 'email_id': email_id, 'clicks': email_clicks[email_id], 'at': now.isoformat(),
+        })
+
+
+class ClickRecorder:
+    """
+    Queues clicks from the redirect view and writes them in batches on a
+    background thread, so a redirect never waits on the database.
+    """
+
+    batch_size = 500
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def record(self, code, email_id):
+        if not settings.LINK_CLICKS_ASYNC:
+            save_clicks([(code, email_id)])
+            return
+        self.queue.put((code, email_id))
+        if self.thread is None:
+            with self.lock:
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self.run, name='mailer-click-recorder', daemon=True)
+                    self.thread.start()
+
+    async def arecord(self, code, email_id):
+        # For async views: queueing never blocks, but a synchronous save needs a thread
+        if settings.LINK_CLICKS_ASYNC:
+            self.record(code, email_id)
+        else:
+            await sync_to_async(save_clicks)([(code, email_id)])
+
+    def drain(self, block):
+        clicks = [self.queue.get()] if block else []
+        while len(clicks) < self.batch_size:
+            try:
+                clicks.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return clicks
+
+    def run(self):
+        while True:
+            clicks = self.drain(block=True)
+            close_old_connections()
+            try:
+                save_clicks(clicks)
+            except Exception:
+                logger.exception("Failed to record %d link clicks", len(clicks))
+
+    def flush(self):
+        clicks = self.drain(block=False)
+        if clicks:
+            save_clicks(clicks)
+
+
+click_recorder = ClickRecorder()
+atexit.register(click_recorder.flush)
@@ -0,0 +1,83 @@
+# Helpers shared by the bench_* commands (not a command itself: leading underscore)
+import socketserver
+import threading
+import time
+from importlib import import_module
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.core.management.base import CommandError
+
+
+def bench_host():
+    host = next((h for h in settings.ALLOWED_HOSTS if h != '*'), 'localhost')
+    return 'bench' + host if host.startswith('.') else host
+
+
+def login_session(username=None):
+    """Create a real session for a user so benchmark requests go through the full auth stack."""
+    user = User.objects.filter(username=username).first() if username else User.objects.first()
+    if user is None:
+        raise CommandError('No user to log in as; create one or pass --username.')
+    session = import_module(settings.SESSION_ENGINE).SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.save()
+    return session
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        self.reply('220 localhost bench SMTP')
+        for line in self.rfile:
+            command = line.decode(errors='replace').strip()
+            verb = command[:4].upper()
+            if verb in ('HELO', 'EHLO'):
+                self.reply('250 localhost')
+            elif verb == 'RCPT':
+                self.server.wait_for(command.rpartition('@')[2].rstrip('>').lower())
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                for data_line in self.rfile:
+                    if data_line.rstrip(b'\r\n') == b'.':
+                        break
+                self.server.accepted += 1
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('250 OK')
+
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    """
+    Minimal SMTP stand-in on 127.0.0.1 that accepts and discards mail, waiting
+    domain_delays[domain] seconds per recipient to mimic slow receiving servers.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, domain_delays=None):
+        super().__init__(('127.0.0.1', 0), _SMTPHandler)
+        self.domain_delays = domain_delays or {}
+        self.accepted = 0
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def wait_for(self, domain):
+        delay = self.domain_delays.get(domain)
+        if delay:
+            time.sleep(delay)
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
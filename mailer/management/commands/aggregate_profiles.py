@@ -0,0 +1,51 @@
+import glob
+import os
+from collections import Counter
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+class Command(BaseCommand):
+    help = 'Merge collapsed-stack profiles written by all workers into one flamegraph input'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=None, help='Profile directory (defaults to PROFILER_OUTPUT_DIR)')
+        parser.add_argument('--output', '-o', default=None, help='Write merged stacks to this file instead of stdout')
+        parser.add_argument('--path', default=None, help='Only include requests whose root frame contains this string')
+        parser.add_argument('--top', type=int, default=0, help='Also print the N functions with the most self samples')
+
+    def handle(self, *args, **options):
+        directory = options['dir'] or settings.PROFILER_OUTPUT_DIR
+        files = sorted(glob.glob(os.path.join(directory, 'profile-*.collapsed*')))
+        if not files:
+            raise CommandError(f'No profiles found in {directory}')
+
+        stacks = Counter()
+        for path in files:
+            with open(path) as f:
+                for line in f:
+                    stack, _, count = line.rstrip('\n').rpartition(' ')
+                    if not stack or not count.isdigit():
+                        continue
+                    if options['path'] and options['path'] not in stack.split(';', 1)[0]:
+                        continue
+                    stacks[stack] += int(count)
+
+        lines = [f"{stack} {count}" for stack, count in sorted(stacks.items())]
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write('\n'.join(lines) + '\n')
+        else:
+            self.stdout.write('\n'.join(lines))
+
+        if options['top']:
+            leaves = Counter()
+            for stack, count in stacks.items():
+                leaves[stack.rsplit(';', 1)[-1]] += count
+            total = sum(stacks.values())
+            self.stderr.write(f'Top {options["top"]} functions by self samples ({total} samples total):')
+            for leaf, count in leaves.most_common(options['top']):
+                self.stderr.write(f'{count:8d} {100 * count / total:5.1f}%  {leaf}')
+
+        self.stderr.write(self.style.SUCCESS(
+            f'Merged {sum(stacks.values())} samples from {len(files)} files.'
+        ))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from mailer.retention import archivable_emails, archive_emails, expired_trash, purge_trash
+
+class Command(BaseCommand):
+    help = 'Purge expired trash and move old mail into the compressed archive table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trash-days', type=int, default=None, help='Override TRASH_RETENTION_DAYS')
+        parser.add_argument('--archive-days', type=int, default=None, help='Override ARCHIVE_AFTER_DAYS')
+        parser.add_argument('--chunk-size', type=int, default=None, help='Primary-key window per transaction')
+        parser.add_argument('--skip-purge', action='store_true')
+        parser.add_argument('--skip-archive', action='store_true')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many rows would be affected')
+
+    def handle(self, *args, **options):
+        trash = expired_trash(days=options['trash_days'])
+        old = archivable_emails(days=options['archive_days'])
+
+        if options['dry_run']:
+            if not options['skip_purge']:
+                self.stdout.write(f'{trash.count()} trashed emails would be purged.')
+            if not options['skip_archive']:
+                self.stdout.write(f'{old.count()} emails would be archived.')
+            return
+
+        if not options['skip_purge']:
+            purged = purge_trash(trash, options['chunk_size'])
+            self.stdout.write(self.style.SUCCESS(f'Purged {purged} trashed emails.'))
+        if not options['skip_archive']:
+            archived = archive_emails(old, options['chunk_size'])
+            self.stdout.write(self.style.SUCCESS(f'Archived {archived} emails.'))
@@ -0,0 +1,67 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from ._bench import bench_host
+
+# Runs in a fresh interpreter so every run pays the full cold-start cost
+CHILD_SCRIPT = """
+import json, sys, time
+from wsgiref.util import setup_testing_defaults
+started = time.perf_counter()
+from imgview.wsgi import application
+imported = time.perf_counter()
+environ = {'PATH_INFO': sys.argv[1], 'HTTP_HOST': sys.argv[2], 'wsgi.url_scheme': 'https'}
+setup_testing_defaults(environ)
+status = []
+body = b''.join(application(environ, lambda s, h, exc_info=None: status.append(s)))
+responded = time.perf_counter()
+print(json.dumps({
+    'status': status[0],
+    'import': imported - started,
+    'first_response': responded - imported,
+}))
+"""
+
+class Command(BaseCommand):
+    help = 'Measure time-to-first-response of the WSGI app from a fresh interpreter'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/accounts/login/', help='Path requested by the first request')
+        parser.add_argument('--runs', type=int, default=5)
+
+    def handle(self, *args, **options):
+        host = bench_host()
+
+        samples = []
+        for _ in range(options['runs']):
+            started = time.perf_counter()
+            result = subprocess.run(
+                [sys.executable, '-c', CHILD_SCRIPT, options['path'], host],
+                cwd=settings.BASE_DIR,
+                env=os.environ.copy(),
+                capture_output=True,
+                text=True,
+            )
+            wall = time.perf_counter() - started
+            if result.returncode != 0:
+                raise CommandError(f"Cold start failed:\n{result.stderr[-2000:]}")
+            sample = json.loads(result.stdout.strip().splitlines()[-1])
+            sample['total'] = wall
+            samples.append(sample)
+            self.stdout.write(
+                f"{sample['status']}: import {sample['import'] * 1000:.0f} ms, "
+                f"first response {sample['first_response'] * 1000:.0f} ms, "
+                f"process total {wall * 1000:.0f} ms"
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Median over {len(samples)} runs: "
+            f"import {statistics.median(s['import'] for s in samples) * 1000:.0f} ms, "
+            f"first response {statistics.median(s['first_response'] for s in samples) * 1000:.0f} ms, "
+            f"process total {statistics.median(s['total'] for s in samples) * 1000:.0f} ms"
+        ))
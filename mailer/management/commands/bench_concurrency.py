@@ -0,0 +1,137 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from ._bench import bench_host, login_session
+
+class Command(BaseCommand):
+    help = 'Compare requests/second of the ASGI and WSGI handlers at high concurrency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/mailer/profile/', help='Path to request')
+        parser.add_argument('--username', default=None, help='User to log in as (defaults to the first user)')
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=100)
+        parser.add_argument('--handler', choices=['wsgi', 'asgi'], help='Run only this handler, in this process')
+
+    def handle(self, *args, **options):
+        if options['handler'] is None:
+            # Each handler gets its own process so it runs with the settings its
+            # server would: DJANGO_ASGI=1 turns persistent connections off
+            for handler, asgi in (('wsgi', ''), ('asgi', '1')):
+                self.run_child(handler, asgi, options)
+            return
+
+        session = login_session(options['username'])
+        host = bench_host()
+        cookie = f'{settings.SESSION_COOKIE_NAME}={session.session_key}'
+
+        if options['handler'] == 'wsgi':
+            # WSGI is measured as a threaded server would run it: one thread per in-flight request
+            elapsed, statuses = self.run_wsgi(options, host, cookie)
+            self.report('WSGI (threads)', options, elapsed, statuses)
+        else:
+            elapsed, statuses = asyncio.run(self.run_asgi(options, host, cookie))
+            self.report('ASGI (event loop)', options, elapsed, statuses)
+
+        session.delete()
+
+    def run_child(self, handler, asgi, options):
+        command = [
+            sys.executable, '-m', 'django', 'bench_concurrency', '--handler', handler,
+            '--path', options['path'],
+            '--requests', str(options['requests']),
+            '--concurrency', str(options['concurrency']),
+        ]
+        if options['username']:
+            command += ['--username', options['username']]
+        result = subprocess.run(
+            command,
+            cwd=settings.BASE_DIR,
+            env={**os.environ, 'DJANGO_ASGI': asgi},
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(f"The {handler} run failed:\n{result.stderr[-2000:]}")
+        self.stdout.write(result.stdout, ending='')
+
+    def report(self, label, options, elapsed, statuses):
+        self.stdout.write(
+            f"{label:>18}: {options['requests'] / elapsed:8.1f} req/s "
+            f"({options['requests']} requests, concurrency {options['concurrency']}, statuses {dict(statuses)})"
+        )
+
+    def run_wsgi(self, options, host, cookie):
+        handler = WSGIHandler()
+        statuses = Counter()
+
+        def request(_):
+            environ = {
+                'REQUEST_METHOD': 'GET',
+                'PATH_INFO': options['path'],
+                'QUERY_STRING': '',
+                'SERVER_NAME': host,
+                'SERVER_PORT': '443',
+                'HTTP_HOST': host,
+                'HTTP_COOKIE': cookie,
+                'wsgi.url_scheme': 'https',
+                'wsgi.input': BytesIO(),
+                'wsgi.errors': self.stderr,
+            }
+            response = handler(environ, lambda status, headers, exc_info=None: statuses.update([status[:3]]))
+            b''.join(response)
+            response.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            list(pool.map(request, range(options['requests'])))
+        return time.perf_counter() - started, statuses
+
+    async def run_asgi(self, options, host, cookie):
+        handler = ASGIHandler()
+        statuses = Counter()
+        semaphore = asyncio.Semaphore(options['concurrency'])
+
+        async def request():
+            body_sent = False
+
+            async def receive():
+                nonlocal body_sent
+                if not body_sent:
+                    body_sent = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                # The client never disconnects; Django cancels this once the response is sent
+                await asyncio.Event().wait()
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    statuses.update([str(message['status'])])
+
+            scope = {
+                'type': 'http',
+                'asgi': {'version': '3.0'},
+                'http_version': '1.1',
+                'method': 'GET',
+                'scheme': 'https',
+                'path': options['path'],
+                'root_path': '',
+                'query_string': b'',
+                'headers': [(b'host', host.encode()), (b'cookie', cookie.encode())],
+                'server': (host, 443),
+                'client': ('127.0.0.1', 0),
+            }
+            async with semaphore:
+                await handler(scope, receive, send)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(request() for _ in range(options['requests'])))
+        return time.perf_counter() - started, statuses
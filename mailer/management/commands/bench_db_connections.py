@@ -0,0 +1,66 @@
+import statistics
+import time
+from io import BytesIO
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connections
+from ._bench import bench_host, login_session
+
+class Command(BaseCommand):
+    help = 'Compare request latency with per-request connections versus persistent connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/mailer/inbox/', help='Path to request')
+        parser.add_argument('--username', default=None, help='User to log in as (defaults to the first user)')
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        session = login_session(options['username'])
+        host = bench_host()
+
+        # Going through WSGIHandler fires request_started/request_finished, which is
+        # where Django closes connections that are past CONN_MAX_AGE
+        handler = WSGIHandler()
+        connection = connections[options['database']]
+        persistent_age = settings.DATABASES[options['database']].get('CONN_MAX_AGE') or 600
+
+        results = {}
+        for label, max_age in (('per-request connections', 0), ('persistent connections', persistent_age)):
+            connection.close()
+            connection.settings_dict['CONN_MAX_AGE'] = max_age
+            timings = []
+            for _ in range(options['requests']):
+                environ = {
+                    'REQUEST_METHOD': 'GET',
+                    'PATH_INFO': options['path'],
+                    'QUERY_STRING': '',
+                    'SERVER_NAME': host,
+                    'SERVER_PORT': '443',
+                    'HTTP_HOST': host,
+                    'HTTP_COOKIE': f'{settings.SESSION_COOKIE_NAME}={session.session_key}',
+                    'wsgi.url_scheme': 'https',
+                    'wsgi.input': BytesIO(),
+                    'wsgi.errors': self.stderr,
+                }
+                status = []
+                started = time.perf_counter()
+                response = handler(environ, lambda s, h, exc_info=None: status.append(s))
+                b''.join(response)
+                response.close()
+                timings.append(time.perf_counter() - started)
+            if not status[0].startswith('200'):
+                self.stderr.write(self.style.WARNING(f'{options["path"]} returned {status[0]}'))
+            results[label] = timings
+
+        connection.settings_dict['CONN_MAX_AGE'] = persistent_age
+        session.delete()
+
+        for label, timings in results.items():
+            timings.sort()
+            self.stdout.write(
+                f"{label:>24}: mean {statistics.mean(timings) * 1000:7.2f} ms, "
+                f"p50 {timings[len(timings) // 2] * 1000:7.2f} ms, "
+                f"p95 {timings[int(len(timings) * 0.95)] * 1000:7.2f} ms"
+            )
@@ -0,0 +1,82 @@
+import statistics
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.db.models.functions import Length
+from mailer.models import Email, EmailBody
+
+LIST_COLUMNS = ['id', 'subject', 'recipient', 'sent_at', 'starred']
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Time folder queries with and without message bodies and report body storage size'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help='Insert N synthetic emails first (rolled back afterwards)')
+        parser.add_argument('--body-size', type=int, default=4000, help='Approximate size of synthetic bodies in bytes')
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--page-size', type=int, default=50)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                user = self.seed(options) if options['seed'] else self.busiest_user()
+                self.report(user, options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def busiest_user(self):
+        user = User.objects.filter(emails__isnull=False).order_by('-pk').first()
+        if user is None:
+            raise CommandError('No emails to benchmark; pass --seed N to generate some.')
+        return user
+
+    def seed(self, options):
+        user = User.objects.create_user(f'bench-bodies-{time.time_ns()}')
+        paragraph = 'Hello, this is a synthetic message body used for benchmarking folder queries. '
+        body = (paragraph * (options['body_size'] // len(paragraph) + 1))[:options['body_size']]
+        for start in range(0, options['seed'], 1000):
+            emails = Email.objects.bulk_create([
+                Email(user=user, recipient=f'r{i}@example.com', subject=f'Subject {i}', category='inbox')
+                for i in range(start, min(start + 1000, options['seed']))
+            ])
+            EmailBody.objects.bulk_create([
+                EmailBody(email=email, **EmailBody.encode(f'{email.subject}\n{body}')) for email in emails
+            ])
+        return user
+
+    def time_query(self, queryset, options):
+        timings = []
+        for _ in range(options['iterations']):
+            started = time.perf_counter()
+            list(queryset[:options['page_size']])
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings) * 1000
+
+    def report(self, user, options):
+        folder = Email.objects.filter(user=user, category='inbox').order_by('-sent_at', '-pk')
+        # "Before" is emulated by joining the bodies into the listing, which is
+        # what every folder query used to read from the wide mailer_email rows
+        with_bodies = self.time_query(folder.select_related('body'), options)
+        list_only = self.time_query(folder.only(*LIST_COLUMNS), options)
+        self.stdout.write(f'Folder page with bodies:    {with_bodies:8.2f} ms (median)')
+        self.stdout.write(f'Folder page without bodies: {list_only:8.2f} ms (median)')
+
+        stored = EmailBody.objects.aggregate(total=Sum(Length('data')))['total'] or 0
+        raw = sum(len(body.text.encode('utf-8')) for body in EmailBody.objects.iterator(chunk_size=1000))
+        self.stdout.write(
+            f'Body storage: {raw / 1024:.0f} KiB uncompressed, {stored / 1024:.0f} KiB stored '
+            f'({100 * stored / raw if raw else 0:.0f}%)'
+        )
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                for table in (Email._meta.db_table, EmailBody._meta.db_table):
+                    cursor.execute('SELECT pg_size_pretty(pg_total_relation_size(%s))', [table])
+                    self.stdout.write(f'{table}: {cursor.fetchone()[0]} on disk')
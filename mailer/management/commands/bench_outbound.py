@@ -0,0 +1,69 @@
+import time
+from functools import partial
+from types import SimpleNamespace
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+from mailer.outbound import OutboundScheduler
+from ._bench import LocalSMTPServer
+
+class Command(BaseCommand):
+    help = 'Compare one sequential SMTP connection with the per-domain outbound scheduler against a local SMTP stand-in'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=300)
+        parser.add_argument('--domains', type=int, default=6)
+        parser.add_argument('--slow-delay', type=float, default=0.05, help='Seconds per message for slow.example.com')
+        parser.add_argument('--domain-rate', type=float, default=0, help='Per-domain sends per second (0 = unlimited)')
+        parser.add_argument('--global-rate', type=float, default=0, help='Overall sends per second (0 = unlimited)')
+        parser.add_argument('--concurrency', type=int, default=2, help='Connections per domain')
+
+    def handle(self, *args, **options):
+        server = LocalSMTPServer({'slow.example.com': options['slow_delay']})
+        connection_factory = partial(
+            get_connection, 'django.core.mail.backends.smtp.EmailBackend',
+            host='127.0.0.1', port=server.port, username='', password='', use_tls=False, use_ssl=False,
+        )
+        domains = ['slow.example.com'] + [f'd{i}.example.com' for i in range(1, options['domains'])]
+        emails = [SimpleNamespace(recipient=f'user{i}@{domains[i % len(domains)]}') for i in range(options['messages'])]
+
+        def run(send):
+            finished = {}
+            started = time.perf_counter()
+
+            def deliver(email, connection):
+                ok = connection.send_messages([
+                    EmailMessage('Benchmark', 'Hello', 'bench@example.com', [email.recipient], connection=connection)
+                ]) == 1
+                finished[email.recipient.rpartition('@')[2]] = time.perf_counter() - started
+                return ok
+
+            sent = send(emails, deliver)
+            elapsed = time.perf_counter() - started
+            others = max(t for domain, t in finished.items() if domain != 'slow.example.com')
+            return sent, elapsed, others
+
+        def sequential(emails, deliver):
+            with connection_factory() as connection:
+                return sum(deliver(email, connection) for email in emails)
+
+        scheduler = OutboundScheduler(
+            global_rate=options['global_rate'],
+            domain_rate=options['domain_rate'],
+            domain_concurrency=options['concurrency'],
+            connection_factory=connection_factory,
+        )
+        try:
+            for label, send in (('single connection', sequential), ('outbound scheduler', scheduler.send)):
+                sent, elapsed, others = run(send)
+                self.stdout.write(
+                    f'{label:>18}: {sent} sent in {elapsed:6.2f} s ({sent / elapsed:7.1f}/s), '
+                    f'other domains done after {others:6.2f} s'
+                )
+            metrics = scheduler.metrics.snapshot()
+            self.stdout.write(
+                f'scheduler metrics: sent {metrics["sent"]}, failed {metrics["failed"]}, '
+                f'queue depth {metrics["queue_depth"]}, {metrics["send_rate"]:.1f}/s'
+            )
+        finally:
+            server.stop()
+        self.stdout.write(self.style.SUCCESS(f'Stand-in accepted {server.accepted} messages.'))
@@ -0,0 +1,30 @@
+import time
+from django.core.management.base import BaseCommand
+from mailer.dispatch import claim_due_emails, due_emails, send_claimed
+from mailer.outbound import outbound_scheduler
+
+class Command(BaseCommand):
+    help = 'Send scheduled emails that are due; safe to run in several processes at once'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--loop', action='store_true', help='Keep polling for due emails instead of exiting')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep when nothing is due')
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            emails = claim_due_emails(options['batch_size'])
+            if emails:
+                sent = send_claimed(emails)
+                total += sent
+                metrics = outbound_scheduler.metrics.snapshot()
+                self.stdout.write(
+                    f'Sent {sent} of {len(emails)} claimed emails '
+                    f'({metrics["send_rate"]:.1f}/s, {due_emails().count()} still due).'
+                )
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(f'Dispatched {total} scheduled emails.'))
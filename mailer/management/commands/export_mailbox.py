@@ -0,0 +1,30 @@
+import sys
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from mailer.export import FOLDERS, FORMATS, export_mailbox
+
+class Command(BaseCommand):
+    help = "Export a user's mailbox as an mbox file or a ZIP of .eml files"
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--format', choices=FORMATS, default='mbox')
+        parser.add_argument('--folder', action='append', choices=FOLDERS, help='Folder to export; repeatable (defaults to all)')
+        parser.add_argument('--output', default='-', help='File to write, or - for stdout')
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options['username']).first()
+        if user is None:
+            raise CommandError(f"No user named {options['username']!r}.")
+
+        output = sys.stdout.buffer if options['output'] == '-' else open(options['output'], 'wb')
+        written = 0
+        try:
+            for chunk in export_mailbox(user, options['folder'] or FOLDERS, options['format']):
+                output.write(chunk)
+                written += len(chunk)
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
+        if options['output'] != '-':
+            self.stdout.write(self.style.SUCCESS(f"Wrote {written} bytes to {options['output']}."))
@@ -0,0 +1,48 @@
+import os
+import subprocess
+import sys
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+class Command(BaseCommand):
+    help = 'Report the slowest modules imported when loading a module in a fresh interpreter'
+
+    def add_arguments(self, parser):
+        parser.add_argument('module', nargs='?', default='imgview.wsgi', help='Module to import (default: imgview.wsgi)')
+        parser.add_argument('--top', type=int, default=25, help='Number of modules to report')
+        parser.add_argument('--sort', choices=['self', 'cumulative'], default='cumulative')
+
+    def handle(self, *args, **options):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f"import {options['module']}"],
+            cwd=settings.BASE_DIR,
+            env=os.environ.copy(),
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(f"Importing {options['module']} failed:\n{result.stderr[-2000:]}")
+
+        # Lines look like "import time:   self [us] | cumulative | imported package"
+        rows = []
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:'):
+                continue
+            parts = line[len('import time:'):].split('|')
+            if len(parts) != 3 or not parts[0].strip().isdigit():
+                continue
+            rows.append((int(parts[0]), int(parts[1]), parts[2].rstrip()))
+
+        if not rows:
+            raise CommandError('No import timings were reported.')
+
+        key = 0 if options['sort'] == 'self' else 1
+        rows.sort(key=lambda row: row[key], reverse=True)
+        total = sum(row[0] for row in rows)
+
+        self.stdout.write(f"{'self ms':>9} {'cumul ms':>9}  module")
+        for self_us, cumulative_us, name in rows[:options['top']]:
+            self.stdout.write(f"{self_us / 1000:9.1f} {cumulative_us / 1000:9.1f}  {name}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {len(rows)} modules in {total / 1000:.1f} ms for {options['module']}."
+        ))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Max
+from django.db.models.functions import Lower
+from mailer.models import Contact, Email
+
+class Command(BaseCommand):
+    help = "Rebuild every user's contacts from their sent mail"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        rows = (
+            Email.objects.filter(category='sent', sent_at__isnull=False)
+            .values('user_id', address=Lower('recipient'))
+            .annotate(sends=Count('id'), last_used=Max('sent_at'))
+            .order_by()
+        )
+        batch, total = [], 0
+        for row in rows.iterator(chunk_size=options['batch_size']):
+            batch.append(Contact(
+                user_id=row['user_id'], email=row['address'],
+                send_count=row['sends'], last_used_at=row['last_used'],
+            ))
+            if len(batch) >= options['batch_size']:
+                total += self.upsert(batch)
+                batch = []
+        if batch:
+            total += self.upsert(batch)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {total} contacts.'))
+
+    def upsert(self, contacts):
+        Contact.objects.bulk_create(
+            contacts,
+            update_conflicts=True,
+            unique_fields=['user', 'email'],
+            update_fields=['send_count', 'last_used_at'],
+        )
+        return len(contacts)
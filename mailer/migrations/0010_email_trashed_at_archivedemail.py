@@ -0,0 +1,60 @@
+# Generated by Django 5.0.7 on 2026-10-19 13:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def start_trash_retention_clock(apps, schema_editor):
+    # Mail already in the trash has no trashed_at; start its retention period now
+    Email = apps.get_model('mailer', 'Email')
+    Email.objects.filter(category='trash', trashed_at__isnull=True).update(trashed_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mailer', '0009_alter_userprofile_profile_picture'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.BigIntegerField(unique=True)),
+                ('recipient', models.EmailField(max_length=254)),
+                ('subject', models.CharField(max_length=255)),
+                ('body', models.BinaryField()),
+                ('tracking_id', models.UUIDField(unique=True)),
+                ('category', models.CharField(max_length=20)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('sender_email', models.EmailField(max_length=254)),
+                ('attachment', models.CharField(blank=True, max_length=255)),
+                ('opened_at', models.DateTimeField(blank=True, null=True)),
+                ('clicked_at', models.DateTimeField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='email',
+            name='trashed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='email',
+            index=models.Index(condition=models.Q(('category', 'trash')), fields=['trashed_at'], name='mailer_email_trashed_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedemail',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_emails', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='archivedemail',
+            index=models.Index(fields=['user', 'sent_at'], name='mailer_arch_user_id_9614ae_idx'),
+        ),
+        migrations.RunPython(start_trash_retention_clock, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.7 on 2026-10-19 13:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mailer', '0010_email_trashed_at_archivedemail'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='email',
+            name='send_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='email',
+            name='category',
+            field=models.CharField(choices=[('inbox', 'Inbox'), ('sent', 'Sent'), ('draft', 'Draft'), ('trash', 'Trash'), ('scheduled', 'Scheduled'), ('sending', 'Sending')], default='draft', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='email',
+            index=models.Index(condition=models.Q(('category', 'scheduled')), fields=['send_at'], name='mailer_email_scheduled_idx'),
+        ),
+    ]
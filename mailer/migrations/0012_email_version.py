@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-19 13:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mailer', '0011_email_send_at_scheduled'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='email',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.0.7 on 2026-10-19 14:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mailer', '0012_email_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailBody',
+            fields=[
+                ('email', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='body', serialize=False, to='mailer.email')),
+                ('codec', models.CharField(default='raw', max_length=8)),
+                ('data', models.BinaryField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,77 @@
+import zlib
+
+from django.db import migrations, transaction
+from django.db.models import Max, Min
+
+CHUNK_SIZE = 1000
+# Frozen copy of the codec rules at the time of this migration, so later changes
+# to mailer.compression or BODY_COMPRESSION do not change what it does
+COMPRESSION_THRESHOLD = 512
+
+
+def encode_body(text):
+    raw = text.encode('utf-8')
+    if len(raw) < COMPRESSION_THRESHOLD:
+        return 'raw', raw
+    compressed = zlib.compress(raw, 6)
+    if len(compressed) >= len(raw):
+        return 'raw', raw
+    return 'zlib', compressed
+
+
+def decode_body(codec, data):
+    data = bytes(data)
+    if codec == 'zlib':
+        data = zlib.decompress(data)
+    elif codec != 'raw':
+        raise ValueError(f"Cannot restore a {codec!r} body; recompress it with zlib before reversing")
+    return data.decode('utf-8')
+
+
+def pk_windows(queryset):
+    bounds = queryset.aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return
+    for start in range(bounds['low'], bounds['high'] + 1, CHUNK_SIZE):
+        yield queryset.filter(pk__gte=start, pk__lt=start + CHUNK_SIZE)
+
+
+def copy_bodies(apps, schema_editor):
+    Email = apps.get_model('mailer', 'Email')
+    EmailBody = apps.get_model('mailer', 'EmailBody')
+    db = schema_editor.connection.alias
+    # The migration is non-atomic so each chunk commits on its own instead of
+    # holding one transaction over the whole table
+    for chunk in pk_windows(Email.objects.using(db)):
+        with transaction.atomic(using=db):
+            bodies = []
+            for pk, message in chunk.values_list('pk', 'message'):
+                codec, data = encode_body(message)
+                bodies.append(EmailBody(email_id=pk, codec=codec, data=data))
+            EmailBody.objects.using(db).bulk_create(bodies, ignore_conflicts=True)
+
+
+def restore_bodies(apps, schema_editor):
+    Email = apps.get_model('mailer', 'Email')
+    EmailBody = apps.get_model('mailer', 'EmailBody')
+    db = schema_editor.connection.alias
+    for chunk in pk_windows(EmailBody.objects.using(db)):
+        with transaction.atomic(using=db):
+            emails = [
+                Email(pk=email_id, message=decode_body(codec, data))
+                for email_id, codec, data in chunk.values_list('email_id', 'codec', 'data')
+            ]
+            Email.objects.using(db).bulk_update(emails, ['message'])
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('mailer', '0013_emailbody'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_bodies, restore_bodies),
+    ]
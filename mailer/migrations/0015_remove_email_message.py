@@ -0,0 +1,23 @@
+# Generated by Django 5.0.7 on 2026-10-19 14:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mailer', '0014_backfill_emailbody'),
+    ]
+
+    operations = [
+        # A default lets the column be re-added if this migration is reversed
+        migrations.AlterField(
+            model_name='email',
+            name='message',
+            field=models.TextField(default=''),
+        ),
+        migrations.RemoveField(
+            model_name='email',
+            name='message',
+        ),
+    ]
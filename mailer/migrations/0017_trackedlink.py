@@ -0,0 +1,24 @@
+# Generated by Django 5.0.7 on 2026-10-19 13:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mailer', '0016_contact'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrackedLink',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=16, unique=True)),
+                ('url', models.TextField()),
+                ('clicks', models.PositiveIntegerField(default=0)),
+                ('email', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='links', to='mailer.email')),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.7 on 2026-10-19 13:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mailer', '0017_trackedlink'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='email',
+            index=models.Index(fields=['category', 'sent_at'], name='mailer_email_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='email',
+            index=models.Index(condition=models.Q(('starred', True)), fields=['sent_at'], name='mailer_email_starred_idx'),
+        ),
+    ]
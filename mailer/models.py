@@ -1,12 +1,11 @@
 import uuid
 import os
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.utils import timezone
 from datetime import timedelta
 from django.contrib.auth.models import User
-from .storage import SupabaseStorage
-from supabase import create_client, Client
+from .compression import decode_body, decompress_text, encode_body
 
 SUPABASE_URL = os.environ.get('SUPABASE_URL')
 SUPABASE_KEY = os.environ.get('SUPABASE_KEY')
@@ -15,7 +14,6 @@ class Email(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='emails', default=1)
     recipient = models.EmailField()
     subject = models.CharField(max_length=255)
-    message = models.TextField()
     tracking_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
     category = models.CharField(
         max_length=20,
@@ -24,23 +22,152 @@ class Email(models.Model):
             ('sent', 'Sent'),
             ('draft', 'Draft'),
             ('trash', 'Trash'),
+            ('scheduled', 'Scheduled'),
+            ('sending', 'Sending'),
         ],
         default='draft'
     )
     sent_at = models.DateTimeField(null=True, blank=True)
+    send_at = models.DateTimeField(null=True, blank=True)
+    # Set when a dispatcher claims a scheduled email; a 'sending' row whose claim
+    # is older than CLAIM_LEASE is reclaimed. See mailer.dispatch
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    send_attempts = models.PositiveSmallIntegerField(default=0)
     starred = models.BooleanField(default=False)
     sender_email = models.EmailField(default=settings.DEFAULT_EMAIL)
     attachment = models.FileField(upload_to='attachments/', blank=True, null=True)
+    trashed_at = models.DateTimeField(null=True, blank=True)
+    # Bumped on every draft autosave; a save carrying an older version is rejected
+    version = models.PositiveIntegerField(default=0)
 
     class Meta:
         indexes = [
             models.Index(fields=['recipient']),
             models.Index(fields=['sent_at']),
+            # Admin changelist filters
+            models.Index(fields=['category', 'sent_at'], name='mailer_email_category_idx'),
+            models.Index(fields=['sent_at'], condition=models.Q(starred=True), name='mailer_email_starred_idx'),
+            models.Index(fields=['trashed_at'], condition=models.Q(category='trash'), name='mailer_email_trashed_idx'),
+            # Only pending scheduled rows are indexed, so the dispatcher's due scan stays small
+            models.Index(fields=['send_at'], condition=models.Q(category='scheduled'), name='mailer_email_scheduled_idx'),
+            models.Index(fields=['claimed_at'], condition=models.Q(category='sending'), name='mailer_email_sending_idx'),
         ]
 
     def __str__(self):
         return self.subject
 
+    def _get_message(self):
+        if '_message' not in self.__dict__:
+            try:
+                self.__dict__['_message'] = self.body.text
+            except EmailBody.DoesNotExist:
+                self.__dict__['_message'] = ''
+        return self.__dict__['_message']
+
+    def _set_message(self, value):
+        self.__dict__['_message'] = value
+        self.__dict__['_message_changed'] = True
+
+    # The body lives in EmailBody so list queries never read it. It is loaded on
+    # first access (or up front with select_related('body')) and written by save().
+    message = property(_get_message, _set_message)
+
+    def save(self, *args, **kwargs):
+        write_body = self.__dict__.get('_message_changed', False)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            write_body = write_body and 'message' in update_fields
+            update_fields.discard('message')
+            kwargs['update_fields'] = update_fields
+
+        adding = self._state.adding
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            if write_body:
+                fields = EmailBody.encode(self.__dict__['_message'])
+                if adding:
+                    EmailBody.objects.using(self._state.db).create(email=self, **fields)
+                else:
+                    EmailBody.objects.using(self._state.db).update_or_create(email=self, defaults=fields)
+        self.__dict__['_message_changed'] = False
+
+
+class EmailBody(models.Model):
+    email = models.OneToOneField(Email, on_delete=models.CASCADE, primary_key=True, related_name='body')
+    # 'raw', 'zlib' or 'zstd'; see mailer.compression
+    codec = models.CharField(max_length=8, default='raw')
+    data = models.BinaryField()
+
+    @property
+    def text(self):
+        return decode_body(self.codec, self.data)
+
+    @staticmethod
+    def encode(text):
+        codec, data = encode_body(text)
+        return {'codec': codec, 'data': data}
+
+
+class TrackedLink(models.Model):
+    # A link in an outgoing message, replaced by a short redirect code; see mailer.links
+    email = models.ForeignKey(Email, on_delete=models.CASCADE, related_name='links')
+    code = models.CharField(max_length=16, unique=True)
+    url = models.TextField()
+    clicks = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return self.url
+
+
+class Contact(models.Model):
+    # Addresses a user has sent to, maintained as mail goes out; see mailer.contacts
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='contacts')
+    email = models.EmailField()  # stored lower-cased
+    send_count = models.PositiveIntegerField(default=0)
+    last_used_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'email'], name='mailer_contact_user_email_uniq'),
+        ]
+        indexes = [
+            # Pattern opclass so LIKE 'prefix%' can use the index on Postgres regardless of collation
+            models.Index(fields=['user', 'email'], name='mailer_contact_prefix_idx', opclasses=['int4_ops', 'varchar_pattern_ops']),
+        ]
+
+    def __str__(self):
+        return self.email
+
+
+class ArchivedEmail(models.Model):
+    # Compact copy of an Email moved out of the hot table by the retention job
+    original_id = models.BigIntegerField(unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_emails')
+    recipient = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.BinaryField()  # zlib-compressed message, see mailer.compression
+    tracking_id = models.UUIDField(unique=True)
+    category = models.CharField(max_length=20)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    sender_email = models.EmailField()
+    attachment = models.CharField(max_length=255, blank=True)
+    opened_at = models.DateTimeField(null=True, blank=True)
+    clicked_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'sent_at']),
+        ]
+
+    def __str__(self):
+        return self.subject
+
+    @property
+    def message(self):
+        return decompress_text(self.body)
+
 
 class EmailTracking(models.Model):
     email = models.OneToOneField(Email, on_delete=models.CASCADE)
@@ -89,6 +216,8 @@ class UserProfile(models.Model):
 
     def delete_old_image_from_supabase(self, old_image_name):
         # Initialize Supabase client
+        from supabase import create_client, Client
+
         url = SUPABASE_URL
         key = SUPABASE_KEY
         supabase: Client = create_client(url, key)
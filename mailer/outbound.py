@@ -0,0 +1,159 @@
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Allows `rate` sends per second on average, in bursts of up to `burst`. A rate of 0 is unlimited."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """Take a token and return how long to wait before using it."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Going negative queues the caller behind earlier reservations
+            self.tokens -= 1
+            return max(0.0, -self.tokens / self.rate)
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        delay = self.reserve()
+        if delay:
+            time.sleep(delay)
+
+
+class OutboundMetrics:
+    def __init__(self, window=60):
+        self.window = window
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+        self.queued = defaultdict(int)
+        self.sent = 0
+        self.failed = 0
+        self.recent = deque()
+
+    def enqueue(self, domain, count):
+        with self.lock:
+            self.queued[domain] += count
+
+    def done(self, domain, ok):
+        with self.lock:
+            self.queued[domain] -= 1
+            if not self.queued[domain]:
+                del self.queued[domain]
+            if ok:
+                self.sent += 1
+                self.recent.append(time.monotonic())
+            else:
+                self.failed += 1
+
+    def snapshot(self):
+        with self.lock:
+            now = time.monotonic()
+            while self.recent and self.recent[0] < now - self.window:
+                self.recent.popleft()
+            window = min(self.window, now - self.started) or 1
+            return {
+                'queue_depth': sum(self.queued.values()),
+                'queue_depth_by_domain': dict(self.queued),
+                'sent': self.sent,
+                'failed': self.failed,
+                'send_rate': len(self.recent) / window,
+            }
+
+
+def recipient_domain(email):
+    return email.recipient.rpartition('@')[2].lower()
+
+
+class OutboundScheduler:
+    """
+    Sends a batch grouped by recipient domain. Each domain gets up to
+    domain_concurrency SMTP connections, each sending its share of the group
+    in turn, so a slow domain only holds up its own messages. Sends are paced
+    by a per-domain and a global token bucket.
+    """
+
+    def __init__(self, global_rate=None, domain_rate=None, domain_concurrency=None,
+                 max_workers=None, connection_factory=get_connection):
+        self.global_bucket = TokenBucket(settings.OUTBOUND_GLOBAL_RATE if global_rate is None else global_rate)
+        self.domain_rate = settings.OUTBOUND_DOMAIN_RATE if domain_rate is None else domain_rate
+        self.domain_concurrency = domain_concurrency or settings.OUTBOUND_DOMAIN_CONCURRENCY
+        self.max_workers = max_workers or settings.OUTBOUND_MAX_WORKERS
+        self.connection_factory = connection_factory
+        self.domain_buckets = {}
+        self.lock = threading.Lock()
+        self.metrics = OutboundMetrics()
+
+    def domain_bucket(self, domain):
+        # Buckets outlive a batch so pacing carries over between batches
+        with self.lock:
+            if domain not in self.domain_buckets:
+                rate = settings.OUTBOUND_DOMAIN_RATES.get(domain, self.domain_rate)
+                self.domain_buckets[domain] = TokenBucket(rate)
+            return self.domain_buckets[domain]
+
+    def send(self, emails, deliver):
+        """
+        Send emails and return how many succeeded. deliver(email, connection)
+        sends one message and returns whether it was accepted.
+        """
+        groups = defaultdict(list)
+        for email in emails:
+            groups[recipient_domain(email)].append(email)
+
+        lanes = []
+        for domain, group in groups.items():
+            self.metrics.enqueue(domain, len(group))
+            concurrency = min(self.domain_concurrency, len(group))
+            lanes.extend((domain, group[i::concurrency]) for i in range(concurrency))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='mailer-outbound') as pool:
+            return sum(pool.map(lambda lane: self.send_lane(*lane, deliver), lanes))
+
+    def send_lane(self, domain, emails, deliver):
+        bucket = self.domain_bucket(domain)
+        connection = self.connection_factory()
+        sent = 0
+        try:
+            try:
+                connection.open()
+            except Exception:
+                # deliver() still runs, so each message fails and is handled individually
+                logger.exception("Could not open an SMTP connection for %s", domain)
+            for email in emails:
+                bucket.acquire()
+                self.global_bucket.acquire()
+                try:
+                    ok = deliver(email, connection)
+                except Exception:
+                    # Keep going with the rest of the lane; the email's claim
+                    # expires and it is picked up again by a later batch
+                    logger.exception("Could not deliver %r to %s", email, domain)
+                    ok = False
+                self.metrics.done(domain, ok)
+                sent += ok
+        finally:
+            connection.close()
+            # Worker threads have their own database connections
+            connections.close_all()
+        return sent
+
+
+outbound_scheduler = OutboundScheduler()
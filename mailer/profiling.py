@@ -0,0 +1,149 @@
+import os
+import re
+import sys
+import inspect
+import random
+import threading
+import logging
+from collections import Counter
+from logging.handlers import RotatingFileHandler
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+
+def frame_label(frame):
+    code = frame.f_code
+    filename = code.co_filename
+    if filename.startswith(str(settings.BASE_DIR)):
+        filename = os.path.relpath(filename, settings.BASE_DIR)
+    # Semicolons separate frames in collapsed-stack output
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(';', ':')
+
+
+def runs_code(frame, code):
+    while frame is not None:
+        if frame.f_code is code:
+            return True
+        frame = frame.f_back
+    return False
+
+
+def collapse_stack(frame):
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class StackSampler(threading.Thread):
+    """
+    Periodically records the stack of another thread until stopped. Once
+    follow_code is set, a thread currently running that code is sampled instead.
+    """
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.follow_code = None
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def current_frame(self):
+        frames = sys._current_frames()
+        if self.thread_id not in frames:
+            return None
+        if self.follow_code is not None:
+            for frame in frames.values():
+                if runs_code(frame, self.follow_code):
+                    return frame
+        return frames[self.thread_id]
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = self.current_frame()
+            if frame is None:
+                break
+            self.stacks[collapse_stack(frame)] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        return self.stacks
+
+
+_handler = None
+_handler_lock = threading.Lock()
+
+
+def get_profile_logger():
+    # One rotating file per worker process so workers never interleave writes
+    global _handler
+    logger = logging.getLogger('mailer.profiling')
+    with _handler_lock:
+        if _handler is None or _handler.pid != os.getpid():
+            os.makedirs(settings.PROFILER_OUTPUT_DIR, exist_ok=True)
+            if _handler is not None:
+                logger.removeHandler(_handler)
+                _handler.close()
+            _handler = RotatingFileHandler(
+                os.path.join(settings.PROFILER_OUTPUT_DIR, f'profile-{os.getpid()}.collapsed'),
+                maxBytes=settings.PROFILER_MAX_BYTES,
+                backupCount=settings.PROFILER_BACKUP_COUNT,
+            )
+            _handler.pid = os.getpid()
+            _handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(_handler)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+    return logger
+
+
+class SamplingProfilerMiddleware:
+    """
+    Samples the request thread's stack for requests whose path matches one of
+    PROFILER_URL_PATTERNS, or for a random PROFILER_SAMPLE_RATE share of all
+    requests, and appends the result in collapsed-stack format.
+
+    Async views run on an event loop thread while the request thread waits for
+    them, so for those the sampler follows whichever thread is executing the
+    view's code. The request thread is still sampled while the view is
+    suspended, which is where its sync_to_async calls run. Under ASGI, other
+    requests to the same async view share that loop and may show up too.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILER_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.patterns = [re.compile(pattern) for pattern in settings.PROFILER_URL_PATTERNS]
+        self.sample_rate = settings.PROFILER_SAMPLE_RATE
+        self.interval = settings.PROFILER_INTERVAL
+
+    def should_profile(self, request):
+        if any(pattern.search(request.path) for pattern in self.patterns):
+            return True
+        return random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+
+        sampler = request._profile_sampler = StackSampler(threading.get_ident(), self.interval)
+        sampler.start()
+        try:
+            return self.get_response(request)
+        finally:
+            stacks = sampler.stop()
+            if stacks:
+                root = f"{request.method} {request.path}".replace(';', ':')
+                get_profile_logger().info('\n'.join(
+                    f"{root};{stack} {count}" for stack, count in stacks.items()
+                ))
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        sampler = getattr(request, '_profile_sampler', None)
+        if sampler is not None and iscoroutinefunction(view_func):
+            sampler.follow_code = inspect.unwrap(view_func).__code__
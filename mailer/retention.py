@@ -0,0 +1,76 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+from .compression import compress_text
+from .models import ArchivedEmail, Email
+
+ARCHIVE_CATEGORIES = ['inbox', 'sent']
+
+
+def pk_range_chunks(queryset, chunk_size):
+    # Walk fixed-width primary-key windows rather than OFFSET pages so every
+    # chunk is an index range scan and each transaction touches a bounded set of rows
+    bounds = queryset.aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return
+    start = bounds['low']
+    while start <= bounds['high']:
+        yield queryset.filter(pk__gte=start, pk__lt=start + chunk_size)
+        start += chunk_size
+
+
+def expired_trash(now=None, days=None):
+    now = now or timezone.now()
+    days = settings.TRASH_RETENTION_DAYS if days is None else days
+    return Email.objects.filter(category='trash', trashed_at__lt=now - timedelta(days=days))
+
+
+def archivable_emails(now=None, days=None):
+    now = now or timezone.now()
+    days = settings.ARCHIVE_AFTER_DAYS if days is None else days
+    return Email.objects.filter(
+        category__in=ARCHIVE_CATEGORIES,
+        starred=False,
+        sent_at__lt=now - timedelta(days=days),
+    )
+
+
+def purge_trash(queryset, chunk_size=None):
+    deleted = 0
+    for chunk in pk_range_chunks(queryset, chunk_size or settings.RETENTION_CHUNK_SIZE):
+        with transaction.atomic():
+            deleted += chunk.delete()[1].get(Email._meta.label, 0)
+    return deleted
+
+
+def archive_emails(queryset, chunk_size=None):
+    archived = 0
+    for chunk in pk_range_chunks(queryset, chunk_size or settings.RETENTION_CHUNK_SIZE):
+        with transaction.atomic():
+            emails = list(chunk.select_related('emailtracking', 'body').select_for_update(of=('self',)))
+            if not emails:
+                continue
+            ArchivedEmail.objects.bulk_create([archive_record(email) for email in emails])
+            Email.objects.filter(pk__in=[email.pk for email in emails]).delete()
+            archived += len(emails)
+    return archived
+
+
+def archive_record(email):
+    tracking = getattr(email, 'emailtracking', None)
+    return ArchivedEmail(
+        original_id=email.pk,
+        user_id=email.user_id,
+        recipient=email.recipient,
+        subject=email.subject,
+        body=compress_text(email.message),
+        tracking_id=email.tracking_id,
+        category=email.category,
+        sent_at=email.sent_at,
+        sender_email=email.sender_email,
+        attachment=email.attachment.name if email.attachment else '',
+        opened_at=tracking.opened_at if tracking else None,
+        clicked_at=tracking.clicked_at if tracking else None,
+    )
@@ -0,0 +1,104 @@
+import random
+import time
+from contextvars import ContextVar
+from functools import wraps
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, connections
+
+# Per-request routing state. Context variables rather than thread locals so the
+# state follows a request across sync_to_async/async_to_sync boundaries.
+_replica_reads = ContextVar('mailer_replica_reads', default=False)
+_pinned_to_primary = ContextVar('mailer_pinned_to_primary', default=False)
+_wrote_to_primary = ContextVar('mailer_wrote_to_primary', default=False)
+
+# Replica alias -> time until which it is skipped after a failed connection
+_unavailable_until = {}
+
+PIN_COOKIE = 'mailer_primary_pin'
+
+
+def replica_is_available(alias):
+    if _unavailable_until.get(alias, 0) > time.monotonic():
+        return False
+    try:
+        connections[alias].ensure_connection()
+    except DatabaseError:
+        _unavailable_until[alias] = time.monotonic() + settings.REPLICA_RETRY_SECONDS
+        return False
+    return True
+
+
+def replica_reads(view_func):
+    """Allow the mailer queries made by a read-only view to be served by a replica."""
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        token = _replica_reads.set(True)
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            _replica_reads.reset(token)
+    return wrapper
+
+
+def note_write():
+    """Pin the current request's user to the primary; save() and delete() do this via signals."""
+    _wrote_to_primary.set(True)
+
+
+def note_saved(sender, **kwargs):
+    # Connected to post_save/post_delete in MailerConfig.ready. Not db_for_write:
+    # get_or_create routes its lookup there even when it only reads
+    if sender._meta.app_label == 'mailer':
+        note_write()
+
+
+class ReplicaRouter:
+    """
+    Sends mailer reads from views marked with @replica_reads to a random
+    available replica, unless the user wrote recently. Everything else,
+    including all writes, uses the primary ('default') database.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not settings.DATABASE_REPLICAS or model._meta.app_label != 'mailer':
+            return None
+        if not _replica_reads.get() or _pinned_to_primary.get():
+            return None
+        replicas = [alias for alias in settings.DATABASE_REPLICAS if replica_is_available(alias)]
+        return random.choice(replicas) if replicas else None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+
+class ReplicaPinningMiddleware:
+    """
+    Keeps a user's reads on the primary for REPLICA_PIN_SECONDS after a request
+    that wrote mailer data, so they never see a replica that has not yet
+    caught up with their own star, move or send.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned_token = _pinned_to_primary.set(PIN_COOKIE in request.COOKIES)
+        wrote_token = _wrote_to_primary.set(False)
+        try:
+            response = self.get_response(request)
+            if _wrote_to_primary.get():
+                response.set_cookie(
+                    PIN_COOKIE, '1',
+                    max_age=settings.REPLICA_PIN_SECONDS,
+                    secure=settings.SESSION_COOKIE_SECURE,
+                    httponly=True,
+                    samesite='Lax',
+                )
+            return response
+        finally:
+            _pinned_to_primary.reset(pinned_token)
+            _wrote_to_primary.reset(wrote_token)
@@ -1,18 +1,28 @@
+import asyncio
 import os
-from supabase import create_client, Client
+import weakref
 from django.core.files.storage import Storage
 from django.core.files.base import ContentFile
+from django.utils.functional import cached_property
 
 SUPABASE_URL = os.environ.get('SUPABASE_URL')
 SUPABASE_KEY = os.environ.get('SUPABASE_KEY')
 
 class SupabaseStorage(Storage):
     def __init__(self):
-        self.client = create_client(
+        self.bucket = 'user-profile-pictures'
+        self._async_clients = weakref.WeakKeyDictionary()
+
+    @cached_property
+    def client(self):
+        # Imported on first use: the supabase SDK is slow to import and most
+        # requests never touch storage, so cold starts should not pay for it
+        from supabase import create_client
+
+        return create_client(
             SUPABASE_URL,
             SUPABASE_KEY
         )
-        self.bucket = 'user-profile-pictures'
 
     def _open(self, name, mode='rb'):
         try:
@@ -53,4 +63,34 @@ class SupabaseStorage(Storage):
             response = self.client.storage.from_(self.bucket).create_signed_url(file_name, expires_in)
             return response['signedURL']
         except Exception as e:
-            raise Exception(f"Could not generate signed URL: {e}")
\ No newline at end of file
+            raise Exception(f"Could not generate signed URL: {e}")
+
+    def stream(self, name, chunk_size=64 * 1024):
+        # download() returns the whole object; reading a signed URL lets large
+        # files be passed on chunk by chunk
+        import httpx
+
+        with httpx.stream('GET', self.generate_signed_url(name, expires_in=300)) as response:
+            if response.status_code != 200:
+                raise FileNotFoundError(f"Could not open file: {response.status_code}")
+            yield from response.iter_bytes(chunk_size)
+
+    async def async_client(self):
+        # The SDK's async client is tied to the event loop that created it, so
+        # there is one per loop: a single long-lived client under ASGI
+        from supabase import acreate_client
+
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = self._async_clients[loop] = await acreate_client(SUPABASE_URL, SUPABASE_KEY)
+        return client
+
+    async def agenerate_signed_url(self, file_name, expires_in=3600):
+        # Uses the SDK's async client so the event loop is not blocked on Supabase
+        try:
+            client = await self.async_client()
+            response = await client.storage.from_(self.bucket).create_signed_url(file_name, expires_in)
+            return response['signedURL']
+        except Exception as e:
+            raise Exception(f"Could not generate signed URL: {e}")
@@ -1,3 +1,293 @@
-from django.test import TestCase
+import os
+import tempfile
+import time
+from datetime import timedelta
+from smtplib import SMTPException
+from unittest import mock, skipUnless
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from . import dispatch, routers, views
+from .contacts import contact_cache, record_contact, suggest_contacts
+from .links import link_cache, rewrite_links
+from .models import Contact, Email, EmailTracking, TrackedLink, UserProfile
 
-# Create your tests here.
+
+def email_queries(context):
+    return [query['sql'] for query in context.captured_queries if 'mailer_email' in query['sql']]
+
+
+# Run with a replica configured, e.g. DB_REPLICA_URLS=sqlite:////tmp/replica.sqlite3;
+# in tests the replica mirrors the default database. TransactionTestCase so
+# the replica connection sees committed rows rather than waiting on a lock
+@skipUnless('replica_0' in settings.DATABASES, 'Set DB_REPLICA_URLS to run the replica routing tests')
+class ReplicaRoutingTests(TransactionTestCase):
+    # The runner opens every database a test class names, skipped or not
+    databases = {'default', 'replica_0'} if 'replica_0' in settings.DATABASES else {'default'}
+
+    def setUp(self):
+        routers._unavailable_until.clear()
+        self.user = User.objects.create_user('reader', 'reader@example.com', 'pw')
+        self.client.force_login(self.user)
+        self.email = Email.objects.create(user=self.user, recipient='friend@example.com', subject='Hi', category='inbox')
+
+    def get_inbox(self):
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica_0']) as replica:
+            response = self.client.get(reverse('inbox'))
+        self.assertEqual(response.status_code, 200)
+        return email_queries(primary), email_queries(replica)
+
+    def test_replica_reads_view_uses_replica(self):
+        primary, replica = self.get_inbox()
+        self.assertTrue(replica)
+        self.assertFalse(primary)
+
+    def test_unmarked_view_uses_primary(self):
+        with CaptureQueriesContext(connections['replica_0']) as replica:
+            self.client.get(reverse('email_analytics_stream'))
+            self.client.post(reverse('autosave_draft'), {'subject': 'Draft'})
+        self.assertFalse(email_queries(replica))
+
+    def assertPinned(self, response):
+        self.assertIn(routers.PIN_COOKIE, response.cookies)
+        self.assertEqual(response.cookies[routers.PIN_COOKIE]['max-age'], settings.REPLICA_PIN_SECONDS)
+        # The next read from this client stays on the primary
+        primary, replica = self.get_inbox()
+        self.assertTrue(primary)
+        self.assertFalse(replica)
+
+    def test_star_pins_to_primary(self):
+        self.assertPinned(self.client.get(reverse('star_email', args=[self.email.pk])))
+
+    def test_move_pins_to_primary(self):
+        self.assertPinned(self.client.get(reverse('move_to_trash', args=[self.email.pk])))
+
+    @override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+    def test_send_pins_to_primary(self):
+        response = self.client.post(reverse('send_email'), {
+            'recipient': 'friend@example.com',
+            'subject': 'Hello',
+            'message': 'Hello there',
+            'sender_email': 'reader@example.com',
+        })
+        self.assertRedirects(response, reverse('success'), fetch_redirect_response=False)
+        self.assertPinned(response)
+
+    def test_read_does_not_pin(self):
+        response = self.client.get(reverse('inbox'))
+        self.assertNotIn(routers.PIN_COOKIE, response.cookies)
+
+    def test_get_or_create_without_create_does_not_pin(self):
+        UserProfile.objects.create(user=self.user)
+        response = self.client.get(reverse('profile'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(routers.PIN_COOKIE, response.cookies)
+
+    def test_autosave_pins_to_primary(self):
+        draft = self.client.post(reverse('autosave_draft'), {'subject': 'Draft'}).json()
+        cache.clear()
+        response = self.client.post(reverse('autosave_draft'), {**draft, 'subject': 'Edited'})
+        self.assertEqual(response.json()['status'], 'saved')
+        self.assertPinned(response)
+
+    def test_unavailable_replica_falls_back_to_primary(self):
+        with mock.patch.object(routers, 'replica_is_available', return_value=False):
+            primary, replica = self.get_inbox()
+        self.assertTrue(primary)
+        self.assertFalse(replica)
+
+
+class DispatchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('sender', 'sender@example.com', 'pw')
+        self.now = timezone.now()
+        self.due = [
+            Email.objects.create(
+                user=self.user, recipient=f'r{i}@example.com', subject=f'Due {i}',
+                category='scheduled', send_at=self.now - timedelta(minutes=i),
+            )
+            for i in range(3)
+        ]
+
+    def test_claim_marks_rows_sending(self):
+        claimed = dispatch.claim_due_emails(10, self.now)
+        self.assertCountEqual([email.pk for email in claimed], [email.pk for email in self.due])
+        self.assertFalse(dispatch.due_emails(self.now).exists())
+        self.assertEqual(Email.objects.filter(category='sending', claimed_at=self.now).count(), 3)
+
+    def test_racing_claims_are_disjoint(self):
+        # The first dispatcher lists the due rows, then a second one claims two
+        # of them before the first gets to its conditional updates
+        real_due_emails = dispatch.due_emails
+        race = {}
+
+        def racing_due_emails(now=None):
+            queryset = real_due_emails(now)
+            if race:
+                return queryset
+            race['stale'] = list(queryset.values_list('pk', flat=True))
+            race['other'] = dispatch.claim_due_emails(2, now)
+            return Email.objects.filter(pk__in=race['stale']).order_by('send_at')
+
+        # SKIP LOCKED cannot race within one connection; exercise the conditional updates
+        with mock.patch.object(dispatch, 'due_emails', racing_due_emails), \
+                mock.patch.object(connections['default'].features, 'has_select_for_update_skip_locked', False):
+            first = {email.pk for email in dispatch.claim_due_emails(10, self.now)}
+        other = {email.pk for email in race['other']}
+
+        self.assertEqual(len(race['stale']), 3)
+        self.assertEqual(len(other), 2)
+        self.assertFalse(first & other)
+        self.assertEqual(first | other, {email.pk for email in self.due})
+
+    def test_expired_claim_is_reclaimed(self):
+        dispatch.claim_due_emails(10, self.now)
+        self.assertEqual(dispatch.claim_due_emails(10, self.now + timedelta(minutes=1)), [])
+        later = self.now + dispatch.CLAIM_LEASE + timedelta(seconds=1)
+        self.assertEqual(len(dispatch.claim_due_emails(10, later)), 3)
+
+    def test_failed_send_is_rescheduled(self):
+        email, = dispatch.claim_due_emails(1, self.now)
+        with mock.patch.object(dispatch, 'build_message', side_effect=SMTPException('refused')):
+            self.assertFalse(dispatch.deliver(email, connection=None))
+
+        email.refresh_from_db()
+        self.assertEqual(email.category, 'scheduled')
+        self.assertEqual(email.send_attempts, 1)
+        self.assertGreater(email.send_at, timezone.now())
+        self.assertIsNone(email.claimed_at)
+
+    def test_repeatedly_failing_send_goes_back_to_drafts(self):
+        email = self.due[0]
+        Email.objects.filter(pk=email.pk).update(send_attempts=dispatch.MAX_SEND_ATTEMPTS - 1)
+        email.refresh_from_db()
+        with mock.patch.object(dispatch, 'build_message', side_effect=SMTPException('refused')):
+            dispatch.deliver(email, connection=None)
+
+        email.refresh_from_db()
+        self.assertEqual(email.category, 'draft')
+        self.assertIsNone(email.send_at)
+
+
+class LinkTrackingTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('linker', 'linker@example.com', 'pw')
+        self.email = Email.objects.create(user=user, recipient='friend@example.com', subject='Links', category='sent')
+
+    def test_rewritten_link_redirects_and_records_click(self):
+        body = rewrite_links(self.email, 'Read https://en.wikipedia.org/wiki/Foo_(bar).', 'http://testserver')
+        link = TrackedLink.objects.get(email=self.email)
+        self.assertEqual(link.url, 'https://en.wikipedia.org/wiki/Foo_(bar)')
+        self.assertEqual(body, f"Read http://testserver{reverse('follow_link', args=[link.code])}.")
+
+        for _ in range(2):
+            response = self.client.get(reverse('follow_link', args=[link.code]))
+            self.assertRedirects(response, link.url, fetch_redirect_response=False)
+        link.refresh_from_db()
+        self.assertEqual(link.clicks, 2)
+        self.assertTrue(EmailTracking.objects.get(email=self.email).clicked)
+
+    def test_unknown_code_is_404(self):
+        self.assertEqual(self.client.get(reverse('follow_link', args=['missing'])).status_code, 404)
+
+    @override_settings(SITE_URL='')
+    def test_scheduled_mail_keeps_links_without_site_url(self):
+        self.email.message = 'See https://example.org/page'
+        message = dispatch.build_message(self.email)
+        self.assertEqual(message.body, 'See https://example.org/page')
+        self.assertFalse(TrackedLink.objects.exists())
+
+    @override_settings(SITE_URL='https://mail.example.com')
+    def test_scheduled_mail_links_use_site_url(self):
+        self.email.message = 'See https://example.org/page'
+        message = dispatch.build_message(self.email)
+        self.assertTrue(message.body.startswith('See https://mail.example.com/mailer/l/'))
+
+    def tearDown(self):
+        link_cache.links.clear()
+
+
+class ContactTests(TestCase):
+    def setUp(self):
+        contact_cache.indexes.clear()
+        self.user = User.objects.create_user('writer', 'writer@example.com', 'pw')
+        now = timezone.now()
+        # Frequent but stale, against rarely used but recent
+        for _ in range(4):
+            record_contact(self.user.pk, 'ann.old@example.com', now - timedelta(days=120))
+        record_contact(self.user.pk, 'ann.new@example.com', now)
+        record_contact(self.user.pk, 'bob@example.com', now)
+
+    def test_record_contact_counts_sends(self):
+        record_contact(self.user.pk, ' Bob@Example.com ')
+        contact = Contact.objects.get(user=self.user, email='bob@example.com')
+        self.assertEqual(contact.send_count, 2)
+        self.assertEqual(Contact.objects.filter(user=self.user).count(), 3)
+
+    def test_suggestions_rank_by_frecency(self):
+        self.assertEqual(suggest_contacts(self.user.pk, 'ANN'), ['ann.new@example.com', 'ann.old@example.com'])
+        self.assertEqual(suggest_contacts(self.user.pk, 'ann', limit=1), ['ann.new@example.com'])
+        self.assertEqual(suggest_contacts(self.user.pk, 'carol'), [])
+
+    @override_settings(CONTACT_INDEX_MAX=1)
+    def test_large_contact_lists_rank_the_same(self):
+        self.assertIsNone(contact_cache.get(self.user.pk))
+        self.assertEqual(suggest_contacts(self.user.pk, 'ann'), ['ann.new@example.com', 'ann.old@example.com'])
+
+    def tearDown(self):
+        contact_cache.indexes.clear()
+
+
+class ProfilerTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('profiled', 'profiled@example.com', 'pw'))
+
+    def test_async_view_is_sampled(self):
+        async def slow_picture_url(user_profile):
+            deadline = time.monotonic() + 0.2
+            while time.monotonic() < deadline:
+                pass
+            return ''
+
+        with tempfile.TemporaryDirectory() as output_dir, \
+                override_settings(PROFILER_ENABLED=True, PROFILER_URL_PATTERNS=['^/mailer/profile/'],
+                                  PROFILER_OUTPUT_DIR=output_dir), \
+                mock.patch.object(views, 'profile_picture_url', slow_picture_url):
+            self.assertEqual(self.client.get(reverse('profile')).status_code, 200)
+            with open(os.path.join(output_dir, f'profile-{os.getpid()}.collapsed')) as output:
+                stacks = output.read()
+        samples = [line for line in stacks.splitlines() if 'slow_picture_url' in line]
+        self.assertTrue(samples)
+        self.assertTrue(all('profile_view' in line for line in samples))
+
+
+class AutosaveTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_user('drafter', 'drafter@example.com', 'pw'))
+        response = self.client.post(reverse('autosave_draft'), {'subject': 'Draft'})
+        self.draft_id = response.json()['draft_id']
+
+    def save(self, version, **fields):
+        return self.client.post(reverse('autosave_draft'), {'draft_id': self.draft_id, 'version': version, **fields})
+
+    def test_rejected_saves_do_not_debounce(self):
+        self.assertEqual(self.save(0, subject='Draft').json()['status'], 'unchanged')
+        conflict = self.save(5, subject='Stale')
+        self.assertEqual(conflict.status_code, 409)
+        self.assertEqual(conflict.json()['version'], 0)
+
+        response = self.save(conflict.json()['version'], subject='Fresh')
+        self.assertEqual(response.json(), {'status': 'saved', 'version': 1, 'fields': ['subject']})
+
+    def test_writes_are_debounced(self):
+        self.assertEqual(self.save(0, subject='One').status_code, 200)
+        response = self.save(1, subject='Two')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], str(settings.AUTOSAVE_DEBOUNCE_SECONDS))
@@ -4,7 +4,9 @@ from django.urls import path
 from .views import (
     home, send_email, track_email, email_analytics, export_emails_csv,edit_profile,
     track_click, inbox, sent_emails, draft_emails, trash_emails, starred_emails, success,
-    move_to_trash, move_to_inbox, star_email, delete_forever, signup, profile_view, logout_view, custom_login 
+    move_to_trash, move_to_inbox, star_email, delete_forever, signup, profile_view, logout_view, custom_login,
+    autosave_draft, contact_autocomplete, follow_link, email_analytics_stream,
+    export_mailbox,
 )
 
 urlpatterns = [
@@ -18,11 +20,16 @@ urlpatterns = [
     path('success/', success, name='success'), 
     path('track-email/<str:tracking_id>/', track_email, name='track_email'),
     path('email-analytics/', email_analytics, name='email_analytics'),
+    path('email-analytics/stream/', email_analytics_stream, name='email_analytics_stream'),
     path('export-emails/', export_emails_csv, name='export_emails_csv'),
+    path('export-mailbox/', export_mailbox, name='export_mailbox'),
     path('track-click/<str:tracking_id>/<path:url>/', track_click, name='track_click'),
+    path('l/<str:code>/', follow_link, name='follow_link'),
     path('inbox/', inbox, name='inbox'),
     path('sent/', sent_emails, name='sent_emails'),
     path('drafts/', draft_emails, name='draft_emails'),
+    path('drafts/autosave/', autosave_draft, name='autosave_draft'),
+    path('contacts/autocomplete/', contact_autocomplete, name='contact_autocomplete'),
     path('trash/', trash_emails, name='trash_emails'),
     path('starred/', starred_emails, name='starred_emails'),
     path('move-to-trash/<int:email_id>/', move_to_trash, name='move_to_trash'),